@@ -1,3 +1,12 @@
-import config
-import utils
-import streamer
\ No newline at end of file
+import importlib
+
+# Submodules are only imported on first access, so that importing the package doesn't load every subsystem
+_SUBMODULES = ('config', 'utils', 'streamer', 'watcher')
+
+
+def __getattr__(name):
+
+    if name in _SUBMODULES:
+        return importlib.import_module(name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,59 @@
+"""
+Import-time benchmark: measures how long importing each module takes, and how much memory it costs, in a fresh
+interpreter (as a worker process spawned by manager.py would).
+
+    python bench_import.py [module ...]
+
+For a detailed per-package breakdown use:  python -X importtime -c "import utils"
+"""
+
+import subprocess
+import sys
+
+from loguru import logger
+
+# Modules timed by default: the lightweight core first, then the optional subsystems
+MODULES = ['utils', 'watcher', 'pandas', 'eventlet', 'sqlalchemy']
+
+# Script run in a fresh interpreter: prints wall time (s) and peak RSS increase (kB) of the import
+PROBE = """
+import resource, sys, time
+rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in kB on Linux, but in bytes on macOS
+scale = 1024 if sys.platform == 'darwin' else 1
+print(t1 - t0, (rss1 - rss0) // scale)
+"""
+
+
+def measure(module, repeat=5):
+    """Import `module` in `repeat` fresh interpreters and return the best import time (s) and RSS increase (kB)."""
+
+    times, rss = [], []
+    for _ in range(repeat):
+
+        out = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], capture_output=True, text=True)
+        if out.returncode != 0:
+            lines = out.stderr.strip().splitlines()
+            raise ImportError(lines[-1] if lines else f"probe exited with code {out.returncode}")
+
+        t, kb = out.stdout.split()
+        times.append(float(t))
+        rss.append(int(kb))
+
+    return min(times), min(rss)
+
+
+if __name__ == "__main__":
+
+    for module in sys.argv[1:] or MODULES:
+
+        try:
+            t, kb = measure(module)
+            logger.info(f"import {module:<12} {t * 1e3:8.1f} ms {kb / 1024:8.1f} MB")
+
+        except ImportError as e:
+            logger.warning(f"import {module:<12} failed: {e}")
@@ -1,8 +1,8 @@
 from utils import *
 from config import *
 import multiprocessing
+import random
 import time
-import numpy as np
 
 from streamer import LastEntryFetcher
 
@@ -19,11 +19,14 @@ def op1():
             logger.debug(f"Wrote number {number} to file")
 
         # Wait a variable amount of time before writing next
-        time.sleep(np.random.randint(10))
+        time.sleep(random.randrange(10))
 
 
 def op2(pool, key):
 
+    # Only the file watching process needs watchdog / pygtail
+    from watcher import FileWatcher
+
     # Initialize the table to hold watched data
     SQL_CREATE_TABLE = "CREATE TABLE IF NOT EXISTS data_container" \
                        "(ID FLOAT PRIMARY KEY NOT NULL);"  # remember to specify primary key column
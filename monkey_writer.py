@@ -1,5 +1,5 @@
+import random
 import time
-import numpy as np
 from loguru import logger
 
 if __name__ == "__main__":
@@ -16,7 +16,7 @@ if __name__ == "__main__":
                 logger.debug(f"Wrote number {number} to file")
 
             # Wait a variable amount of time before writing next
-            time.sleep(np.random.randint(10))
+            time.sleep(random.randrange(10))
 
     except KeyboardInterrupt:
         logger.error("Monkey writer has been stopped via Keyboard Interrupt.")
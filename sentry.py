@@ -1,5 +1,6 @@
 from utils import *
 from config import *
+from watcher import FileWatcher
 
 if __name__ == "__main__":
 
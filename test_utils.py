@@ -0,0 +1,244 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+sql = pytest.importorskip("psycopg2.sql")
+
+from utils import QueryProfiler, TimeSeries, lttb_indices
+
+
+def render(composable):
+    """Render a psycopg2.sql composable to a string without a database connection."""
+
+    if isinstance(composable, sql.Composed):
+        return "".join(render(c) for c in composable.seq)
+    if isinstance(composable, sql.Identifier):
+        return ".".join('"' + s.replace('"', '""') + '"' for s in composable.strings)
+
+    return composable.string
+
+
+class FakePool:
+    """Stands in for a Database: records the queries it is sent and returns no rows."""
+
+    def __init__(self):
+
+        self.sent = []
+
+    def select_rows(self, query, args=None, fetch_method=2, key=1):
+
+        self.sent.append((render(query), args, key))
+        return []
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 50), (10, 3), (10, 9), (7, 5)])
+def test_lttb_indices(n, threshold):
+
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 7.)
+    keep = lttb_indices(x, y, threshold)
+
+    assert len(keep) == threshold
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+@pytest.mark.parametrize("threshold", [10, 11])
+def test_lttb_indices_keeps_everything_below_threshold(threshold):
+
+    x = np.arange(10, dtype=float)
+    assert list(lttb_indices(x, x, threshold)) == list(range(10))
+
+
+def test_buckets_query():
+
+    pool = FakePool()
+    df = TimeSeries(pool, 'data_container', 'id', 'value', key=2).buckets(60, ('count', 'mean', 't_max'), start=0.)
+
+    query, args, key = pool.sent[0]
+    assert query == ('SELECT (floor("id" / %s) * %s)::float8 AS bucket, count(*) AS count, '
+                     'avg("value")::float8 AS "mean", max("id")::float8 AS "t_max" '
+                     'FROM "data_container" WHERE "id" IS NOT NULL AND "id" >= %s GROUP BY 1 ORDER BY 1;')
+    assert args == (60, 60, 0.) and key == 2
+    assert list(df.columns) == ['bucket', 'count', 'mean', 't_max']
+    assert df['count'].dtype == np.int64 and df['mean'].dtype == np.float64
+
+
+def test_buckets_default_aggregates():
+
+    pool = FakePool()
+    assert list(TimeSeries(pool, 'data_container', 'id').buckets(60).columns) == ['bucket', 'count', 't_min', 't_max']
+    assert list(TimeSeries(pool, 'data_container', 'id', 'value').buckets(60).columns) == \
+        ['bucket', 'count', 'min', 'max', 'mean']
+
+
+def test_bucket_queries_skip_null_timestamps():
+
+    pool = FakePool()
+    ts = TimeSeries(pool, 'data_container', 'id', 'value')
+    ts.buckets(60)
+    ts.downsample(60)
+    ts.window(60, 3)
+
+    for query, _, _ in pool.sent:
+        assert 'FROM "data_container" WHERE "id" IS NOT NULL GROUP BY 1' in query
+
+
+def test_buckets_require_value_column():
+
+    with pytest.raises(ValueError):
+        TimeSeries(FakePool(), 'data_container', 'id').buckets(60, ('mean', ))
+
+
+def test_window_query_spans_time():
+
+    pool = FakePool()
+    TimeSeries(pool, 'data_container', 'id', 'value').window(10, 5)
+
+    query, args, _ = pool.sent[0]
+    assert "RANGE BETWEEN %s PRECEDING AND CURRENT ROW" in query
+    assert args == (10, 10, 40.)
+
+
+def test_lttb_query():
+
+    pool = FakePool()
+    df = TimeSeries(pool, 'data_container', 'id', 'value').lttb(100, end=5.)
+
+    query, args, _ = pool.sent[0]
+    assert 'WHERE "id" IS NOT NULL AND "value" IS NOT NULL AND "id" < %s' in query
+    assert "least(floor((t - t0) / nullif(span, 0) * %s), %s - 1)" in query
+    # M4 points picked by a single GROUP BY, not by window functions sorting every raw row
+    assert "GROUP BY bucket" in query and " OVER " not in query
+    assert args == (5., 400, 400)
+    assert df.empty
+
+
+class FakeCursor:
+    """Stands in for a psycopg2 cursor: records the statements executed and returns a canned EXPLAIN plan."""
+
+    def __init__(self, conn):
+
+        self.conn = conn
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        return False
+
+    def execute(self, query):
+
+        self.conn.executed.append(query)
+
+    def fetchone(self):
+
+        return [[{'Plan': {}, 'Planning Time': 1., 'Execution Time': 2.}]]
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection, as seen by the QueryProfiler."""
+
+    def __init__(self, encoding='UTF8'):
+
+        self.encoding = encoding
+        self.closed = 0
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self):
+
+        return FakeCursor(self)
+
+    def rollback(self):
+
+        self.rollbacks += 1
+
+
+def test_profiler_record_counters():
+
+    profiler = QueryProfiler(threshold=1., explain=False)
+    conn = FakeConnection()
+    template = "SELECT *\n  FROM data_container WHERE id > %s"
+
+    profiler.record(conn, template, b"SELECT * FROM data_container WHERE id > 1", 0.5)
+    profiler.record(conn, template, b"SELECT * FROM data_container WHERE id > 2", 1.)  # threshold is inclusive
+    profiler.record(conn, template, b"SELECT * FROM data_container WHERE id > 3", 0.1, error=Exception("boom"))
+
+    stats = profiler.stats["SELECT * FROM data_container WHERE id > %s"]
+    assert stats == {'calls': 3, 'total': pytest.approx(1.6), 'max': 1., 'slow': 1, 'errors': 1}
+
+
+def test_profiler_report_ordering():
+
+    profiler = QueryProfiler(threshold=10., explain=False, top_n=2)
+    conn = FakeConnection()
+    for template, wall_time in [("SELECT 1", 0.1), ("SELECT 2", 0.3), ("SELECT 3", 0.25), ("SELECT 1", 0.1)]:
+        profiler.record(conn, template, template.encode(), wall_time)
+
+    report = profiler.report()
+    assert [r['template'] for r in report] == ["SELECT 2", "SELECT 3"]
+    assert report[0]['mean'] == pytest.approx(0.3)
+    assert [r['template'] for r in profiler.report(n=3)] == ["SELECT 2", "SELECT 3", "SELECT 1"]
+
+
+def test_profiler_statement_kinds():
+
+    profiler = QueryProfiler()
+    assert profiler.is_explainable("select * from data_container")
+    assert profiler.is_explainable("WITH d AS (DELETE FROM data_container RETURNING *) SELECT * FROM d")
+    assert not profiler.is_explainable("COPY data_container FROM STDIN")
+    assert not profiler.is_explainable("")
+    assert profiler.is_select("SELECT 1")
+    assert not profiler.is_select("WITH d AS (DELETE FROM data_container RETURNING *) SELECT * FROM d")
+
+
+def test_profiler_explains_dml_without_analyze():
+
+    profiler = QueryProfiler(threshold=0., explain=True, analyze=True)
+    conn = FakeConnection()
+
+    profiler.record(conn, "INSERT INTO data_container (ID) VALUES (%s)",
+                    b"INSERT INTO data_container (ID) VALUES (1)", 1.)
+    profiler.record(conn, "SELECT * FROM data_container", b"SELECT * FROM data_container", 1.)
+
+    assert conn.executed == [b"EXPLAIN (FORMAT JSON) INSERT INTO data_container (ID) VALUES (1)",
+                             "SET TRANSACTION READ ONLY;",
+                             b"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT * FROM data_container"]
+    assert conn.rollbacks == 2
+
+
+def test_profiler_decodes_with_connection_encoding():
+
+    assert QueryProfiler.template(FakeConnection(encoding='LATIN1'), b"SELECT 'x\xe9'") == "SELECT 'x\u00e9'"
+
+
+def test_profiler_sinks_are_isolated(tmp_path):
+
+    a = QueryProfiler(threshold=0., explain=False, log_path=tmp_path / "a.log")
+    b = QueryProfiler(threshold=0., explain=False, log_path=tmp_path / "b.log")
+    try:
+        a.record(FakeConnection(), "SELECT 1", b"SELECT 1", 1.)
+    finally:
+        a.close()
+        b.close()
+
+    assert "SELECT 1" in (tmp_path / "a.log").read_text()
+    assert (tmp_path / "b.log").read_text() == ""
+
+
+def test_import_utils_is_lightweight():
+
+    heavy = ['pandas', 'numpy', 'sqlalchemy', 'eventlet', 'watchdog', 'pygtail']
+    probe = f"import sys, utils; print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == []
@@ -1,25 +1,45 @@
 """
 https://bbengfort.github.io/observations/2017/12/06/psycopg2-transactions.html
 
+Lightweight core: only psycopg2 and loguru are imported at module load. Optional subsystems pull in their heavy
+dependencies on first use (pandas / numpy / sqlalchemy for DataFrame I/O, eventlet for the Listener), and file
+watching lives in watcher.py (watchdog / pygtail). See bench_import.py for import-time / memory figures.
 """
 
-import eventlet
+import importlib
 import io
 import psycopg2
+import re
 import sys
-
-import pandas as pd
+import time
 
 from contextlib import contextmanager
-from eventlet.hubs import trampoline
 from loguru import logger
 from psycopg2 import sql
 from psycopg2.extras import DictCursor
 from psycopg2.pool import ThreadedConnectionPool
-from pygtail import Pygtail
-from sqlalchemy import create_engine
-from watchdog.events import PatternMatchingEventHandler
-from watchdog.observers.polling import PollingObserver
+
+
+# Names which used to live in this module, now loaded from their own module on first attribute access
+# (utils.FileWatcher). They are not exported by `from utils import *`: use `from watcher import FileWatcher`.
+_LAZY_ATTRIBUTES = {
+    'InsertToSQL': 'watcher',
+    'FileWatcher': 'watcher',
+}
+
+
+def __getattr__(name):
+    """Resolve names of optional subsystems lazily, so that importing utils stays cheap (PEP 562)."""
+
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
 
 
 class Database:
@@ -35,6 +55,7 @@ class Database:
 
         self.pool = None
         self.conns = {}  # active connections from the pool
+        self.profilers = {}  # query profiling hooks of the connections which have profiling enabled
 
     def open_pool(self, minconns=1, maxconns=None):
         """Creates a connection pool to the PostgreSQL database"""
@@ -56,6 +77,10 @@ class Database:
         """Closes all connections in the pool"""
 
         if self.pool:
+            # Detach the profiling hooks still attached to connections (if any)
+            for key in list(self.profilers):
+                self.disable_profiling(key=key)
+
             self.pool.closeall()
             self.pool = None
             logger.success("All connections in the pool have been closed successfully.")
@@ -152,6 +177,7 @@ class Database:
         if key in self.conns:
 
             conn = self.conns[key]
+            self.disable_profiling(key=key)  # profiling is scoped to this client's use of the connection
             conn.reset()
             self.pool.putconn(conn, key)
             self.conns.pop(key)
@@ -192,11 +218,15 @@ class Database:
         if key in self.conns:
 
             conn = self.conns[key]
+            profiler = self.profilers.get(key)
+            template, records, error = query, None, None
+            start = time.perf_counter()
 
             try:
 
                 with conn.cursor(cursor_factory=DictCursor) as cur:
                     query = cur.mogrify(query, args) if args is not None else cur.mogrify(query)
+                    start = time.perf_counter()
 
                     # Execute query
                     if cur_method == 0:
@@ -216,15 +246,16 @@ class Database:
                         pass
 
                     conn.commit()
+                    wall_time = time.perf_counter() - start
 
                     # Display success message
                     if cur.rowcount >= 0:
                         success_msg += f": {cur.rowcount} rows affected."
                     logger.success(success_msg)
 
-                    return records  # dictionaries
-
             except (Exception, psycopg2.Error, psycopg2.DatabaseError) as e:
+                wall_time = time.perf_counter() - start
+                error = e
                 conn.rollback()
                 logger.error(error_msg + f":{e}. Transaction rolled-back.")
 
@@ -232,9 +263,53 @@ class Database:
             finally:
                 self.conns[key] = conn
 
+            # Hand the statement timing over to the profiling hook (if any), once the transaction is over
+            if profiler is not None:
+                try:
+                    profiler.record(conn, template, query, wall_time, error=error)
+                except Exception as e:
+                    logger.warning(f"Query profiling failed on pool connection [{key}]: {e}")
+
+            return records  # dictionaries
+
         else:
             logger.warning(f"Pool connection [{key}] has never been opened: not available for transactions.")
 
+    def enable_profiling(self, threshold=1.0, explain=True, analyze=False, log_path=None, top_n=10, key=1):
+        """Attach a QueryProfiler to a connection: every statement sent through it will then be timed. Profiling
+        lasts until the connection is put back in the pool.
+
+        Args:
+            threshold (float):  wall time (in seconds) above which a statement is logged as a slow query
+            explain (bool):     capture the EXPLAIN plan of slow (and failed) queries
+            analyze (bool):     for slow plain SELECTs, capture EXPLAIN (ANALYZE, BUFFERS) instead: re-runs the query
+                                in a read-only transaction, doubling the latency of slow calls
+            log_path (string):  (optional) file where to write the slow-query log, as JSON lines
+            top_n (int):        number of query templates to show in the profiling report
+            key (int):          key to identify the connection in the pool to profile
+
+        Returns:
+            profiler (QueryProfiler): the profiling hook attached to the connection
+        """
+
+        self.disable_profiling(key=key)
+        self.profilers[key] = QueryProfiler(threshold=threshold, explain=explain, analyze=analyze, log_path=log_path,
+                                            top_n=top_n)
+        logger.success(f"Query profiling enabled on pool connection [{key}]: slow query threshold {threshold}s.")
+
+        return self.profilers[key]
+
+    def disable_profiling(self, key=1):
+        """Detach the QueryProfiler of a connection (if any), logging its final report."""
+
+        profiler = self.profilers.pop(key, None)
+        if profiler is not None:
+            profiler.log_report()
+            profiler.close()
+            logger.success(f"Query profiling disabled on pool connection [{key}].")
+
+        return profiler
+
     def select_rows(self, query, args=None, fetch_method=2, key=1):
         """Send a select SQL query to the Database. Expects returns."""
 
@@ -306,6 +381,8 @@ class Database:
 
         if key in self.conns:
 
+            from sqlalchemy import create_engine
+
             try:
                 # Create headless csv from pandas dataframe
                 io_file = io.StringIO()
@@ -329,10 +406,185 @@ class Database:
         else:
             logger.warning(f"Pool connection [{key}] has never been opened: cannot use it to copy Dataframe to database.")
 
+    def timeseries(self, table, time_column, value_column=None, key=1):
+        """Time-series query builder pushing aggregation and downsampling of a table to the PostgreSQL server.
+
+            ts = pool.timeseries('data_container', 'id', key=1)
+            df = ts.buckets(width=60, start=t0, end=t1)  # count, t_min, t_max per minute (no value_column)
+
+        Args:
+            table (string):         name of the table holding the time-series
+            time_column (string):   name of the numeric column holding the timestamps (epoch seconds)
+            value_column (string):  name of the column holding the values to aggregate (if any)
+            key (int):              key to identify the connection in the pool being used for the transactions
+
+        Returns:
+            (TimeSeries): query builder bound to this connection
+        """
+
+        return TimeSeries(self, table, time_column, value_column=value_column, key=key)
+
+
+class QueryProfiler:
+    """Per-connection profiling hook, called by Database.send() after each statement.
+
+    Keeps in-process timing statistics per query template (the SQL before argument substitution) and logs the
+    statements slower than a threshold, or which failed, together with their EXPLAIN plan, to a structured
+    slow-query log.
+    """
+
+    # Statements which can be EXPLAINed without executing them (COPY, DDL, LISTEN, ... can't)
+    EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'VALUES', 'TABLE')
+
+    def __init__(self, threshold=1.0, explain=True, analyze=False, log_path=None, top_n=10):
+
+        self.threshold = threshold
+        self.explain = explain
+        self.analyze = analyze
+        self.top_n = top_n
+        self.stats = {}  # query template -> {'calls', 'total', 'max', 'slow', 'errors'}
+
+        # Slow-query log: JSON lines, carrying the query, its timings and its plan. Records are tagged with this
+        # profiler's marker so that each sink only gets the slow queries of its own connection.
+        self.marker = id(self)
+        self.sink = None
+        if log_path is not None:
+            marker = self.marker
+            self.sink = logger.add(log_path, filter=lambda record: record["extra"].get("slow_query") == marker,
+                                   serialize=True)
+
+    def close(self):
+        """Stop writing to the slow-query log."""
+
+        if self.sink is not None:
+            logger.remove(self.sink)
+            self.sink = None
+
+    @staticmethod
+    def template(conn, query):
+        """Normalise a query (string, bytes or Composed) to a single-line string."""
+
+        if isinstance(query, sql.Composable):
+            query = query.as_string(conn)
+        if isinstance(query, bytes):
+            # Mogrified queries are encoded in the connection's client_encoding, which may not be UTF-8
+            codec = psycopg2.extensions.encodings.get(getattr(conn, 'encoding', None), 'utf-8')
+            query = query.decode(codec, errors='replace')
+
+        return re.sub(r"\s+", " ", query).strip()
+
+    def record(self, conn, template, query, wall_time, error=None):
+        """Record the wall time of a statement; EXPLAIN and log it if it was slow or failed.
+
+        Args:
+            conn (connection):      connection the statement was run on (its transaction already committed or
+                                    rolled-back)
+            template (string or Composed): SQL template of the statement, before argument substitution
+            query (bytes):          statement as sent to the server (the template if it could not be built)
+            wall_time (float):      time spent executing, fetching and committing the statement, in seconds
+            error (Exception):      error raised by the statement (if any), e.g. QueryCanceled on statement_timeout
+        """
+
+        template = self.template(conn, template)
+        statement = self.template(conn, query)
+        stats = self.stats.setdefault(template, {'calls': 0, 'total': 0., 'max': 0., 'slow': 0, 'errors': 0})
+        stats['calls'] += 1
+        stats['total'] += wall_time
+        stats['max'] = max(stats['max'], wall_time)
+        stats['errors'] += int(error is not None)
+
+        if wall_time < self.threshold and error is None:
+            return
+
+        stats['slow'] += int(wall_time >= self.threshold)
+        plan, server_time = None, None
+        if self.explain and not conn.closed and isinstance(query, bytes) and self.is_explainable(statement):
+            # Don't re-run statements which failed: a cancelled query would only time out again
+            analyze = self.analyze and error is None and self.is_select(statement)
+            plan, server_time = self.explain_plan(conn, query, analyze=analyze)
+
+        status = f"Failed query ({error})" if error is not None else "Slow query"
+        server_msg = f", {server_time:.3f}s server time" if server_time is not None else ""
+        logger.bind(slow_query=self.marker, template=template, query=statement, wall_time=wall_time,
+                    server_time=server_time, plan=plan, error=None if error is None else str(error)).warning(
+            f"{status} ({wall_time:.3f}s wall time{server_msg}): {template}")
+
+    def is_explainable(self, statement):
+        """Whether the statement (a string) is one EXPLAIN accepts."""
+
+        words = statement.split(None, 1)
+
+        return bool(words) and words[0].upper() in self.EXPLAINABLE
+
+    @staticmethod
+    def is_select(statement):
+        """Whether the statement (a string) is a plain SELECT (a WITH could hide a data-modifying statement)."""
+
+        words = statement.split(None, 1)
+
+        return bool(words) and words[0].upper() == 'SELECT'
+
+    @staticmethod
+    def explain_plan(conn, query, analyze=False):
+        """EXPLAIN a statement, without executing it.
+
+        With analyze=True the statement (which should be a plain SELECT) is re-run under EXPLAIN (ANALYZE, BUFFERS)
+        in a read-only transaction, so that any write it may attempt fails, then rolled back.
+
+        Returns:
+            plan (list):            JSON query plan (None if EXPLAIN failed)
+            server_time (float):    planning + execution time measured by the server, in seconds (analyze only)
+        """
+
+        plan, server_time = None, None
+        try:
+            with conn.cursor() as cur:
+                if analyze:
+                    cur.execute("SET TRANSACTION READ ONLY;")
+                    cur.execute(b"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query)
+                else:
+                    cur.execute(b"EXPLAIN (FORMAT JSON) " + query)
+                plan = cur.fetchone()[0]
+
+            if analyze:
+                server_time = (plan[0].get('Planning Time', 0.) + plan[0]['Execution Time']) / 1e3
+
+        except (Exception, psycopg2.Error) as e:
+            logger.warning(f"Could not EXPLAIN query: {e}")
+
+        finally:
+            if not conn.closed:
+                conn.rollback()
+
+        return plan, server_time
+
+    def report(self, n=None):
+        """Top-n query templates by total wall time.
+
+        Returns:
+            report (list): dictionaries with the template, number of calls (and slow / failed calls), total / mean /
+                           max time
+        """
+
+        n = n if n is not None else self.top_n
+        ranked = sorted(self.stats.items(), key=lambda item: item[1]['total'], reverse=True)[:n]
+
+        return [dict(template=template, mean=stats['total'] / stats['calls'], **stats) for template, stats in ranked]
+
+    def log_report(self, n=None):
+        """Log the top-n query templates by total wall time."""
+
+        lines = [f"{r['total']:9.3f}s total {r['mean']:8.4f}s mean {r['max']:8.4f}s max "
+                 f"{r['calls']:7d} calls {r['slow']:5d} slow {r['errors']:5d} failed  {r['template']}"
+                 for r in self.report(n)]
+        logger.info("Query profiling report:\n" + "\n".join(lines))
+
 
 def convert_to_df(query_results):
     """Make pandas dataframe out of SQL query results"""
 
+    import pandas as pd
+
     columns = [k for k in query_results[0].keys()]
     df = pd.DataFrame(query_results, columns=columns)
     logger.debug(f"Successful conversion to DataFrame:\n{df.head()}")
@@ -340,83 +592,237 @@ def convert_to_df(query_results):
     return df
 
 
-class InsertToSQL(PatternMatchingEventHandler):
+class TimeSeries:
+    """Builds server-side aggregation / downsampling queries on a time-series table so that only the reduced
+    results travel over the wire. Results are returned as pandas DataFrames with typed (float64 / int64) columns.
 
-    def __init__(self, pool, query, patterns=None, ignore_patterns=None, ignore_directories=True, case_sensitive=True, key=1):
+    Timestamps are expected as numeric epoch seconds (e.g. data_container.id as written by monkey_writer.py).
+    """
 
-        super().__init__(patterns, ignore_patterns, ignore_directories, case_sensitive)
+    # Aggregates which can be requested by name, and the PostgreSQL functions computing them
+    AGGREGATES = {
+        'count': 'count',
+        'min': 'min',
+        'max': 'max',
+        'mean': 'avg',
+        'sum': 'sum',
+        'std': 'stddev_samp',
+        't_min': 'min',  # applied to the time column: earliest timestamp in the bucket
+        't_max': 'max',  # applied to the time column: latest timestamp in the bucket
+    }
+
+    def __init__(self, pool, table, time_column, value_column=None, key=1):
 
         self.pool = pool
         self.key = key
-        self.query = query
+        self.table = sql.Identifier(table)
+        self.time = sql.Identifier(time_column)
+        self.value = sql.Identifier(value_column) if value_column is not None else None
+
+    def _where(self, start=None, end=None, not_null=()):
+        """Compose the WHERE clause (and its args) restricting the query to the [start, end) time range, and to the
+        rows where the `not_null` columns are set."""
+
+        clauses, args = [sql.SQL("{} IS NOT NULL").format(column) for column in not_null], []
+        if start is not None:
+            clauses.append(sql.SQL("{} >= %s").format(self.time))
+            args.append(start)
+        if end is not None:
+            clauses.append(sql.SQL("{} < %s").format(self.time))
+            args.append(end)
+
+        if clauses:
+            return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(clauses), args
+
+        return sql.SQL(""), args
+
+    def _aggregates(self, aggregates):
+        """Compose the list of aggregate expressions for the SELECT clause of a bucketing query."""
+
+        fields = [sql.SQL("count(*) AS count")]
+        for name in aggregates:
+
+            if name not in self.AGGREGATES:
+                raise ValueError(f"Unknown aggregate '{name}'. Choose from: {list(self.AGGREGATES)}")
+
+            if name == 'count':
+                continue
+
+            column = self.time if name in ('t_min', 't_max') else self.value
+            if column is None:
+                raise ValueError(f"Aggregate '{name}' requires a value_column.")
+
+            fields.append(sql.SQL("{}({})::float8 AS {}").format(sql.SQL(self.AGGREGATES[name]), column,
+                                                                sql.Identifier(name)))
+
+        return sql.SQL(", ").join(fields)
+
+    def _bucket_query(self, width, aggregates, start=None, end=None):
+        """Compose the GROUP BY time-bucket query (and its args) shared by buckets() and window()."""
+
+        where, where_args = self._where(start, end, not_null=(self.time, ))
+        query = sql.SQL("SELECT (floor({t} / %s) * %s)::float8 AS bucket, {fields} FROM {table}{where} "
+                        "GROUP BY 1").format(t=self.time, fields=self._aggregates(aggregates), table=self.table,
+                                             where=where)
 
-    # The following event_type exist:
-    # 'moved', 'deleted', 'created', 'modified'
+        return query, [width, width] + where_args
 
-    # Here we handle only the default callback for 'modified' event
-    # which will be triggered under the hood only for files matching pattern
-    def on_modified(self, event):
+    def _fetch(self, query, args, columns):
+        """Run a query on the bound connection and return its results as a typed DataFrame."""
 
-        # And decide to only watch for file changes
-        if not event.is_directory:
+        records = self.pool.select_rows(query, tuple(args), key=self.key)
 
-            # Process event (i.e send SQL)
-            self.process_event(event)
+        return to_typed_df(records, columns)
 
-    def process_event(self, event):
-        """Function handling what happens to an event raised by the watchdog: here we write any file changes as new entries
-        in a database table.
+    def buckets(self, width, aggregates=None, start=None, end=None):
+        """Aggregate the time-series in fixed-width time buckets on the server.
 
         Args:
-            event:                  watchdog event
-            database (Database):    Database object containing the table we want to inject to
-            query (string):         SQL query psycopg2 template whose %s will be filled by new file contents
+            width (float):          bucket width, in seconds
+            aggregates (iterable):  names of the aggregates to compute per bucket (see TimeSeries.AGGREGATES).
+                                    The row count of each bucket is always returned. Defaults to min / max / mean
+                                    of the value column, or to t_min / t_max if there is no value column.
+            start (float):          (optional) only consider timestamps >= start
+            end (float):            (optional) only consider timestamps < end
+
+        Returns:
+            df (pandas.DataFrame):  one row per non-empty bucket, ordered by bucket start time
         """
 
-        logger.debug(f"Event detected: {event.event_type} {event.src_path}")
+        if aggregates is None:
+            aggregates = ('min', 'max', 'mean') if self.value is not None else ('t_min', 't_max')
+
+        query, args = self._bucket_query(width, aggregates, start, end)
+        query = query + sql.SQL(" ORDER BY 1;")
+        columns = ['bucket', 'count'] + [name for name in aggregates if name != 'count']
+
+        return self._fetch(query, args, columns)
 
-        # Use Pygtail to return unread (i.e.) new lines in modified file
-        for line in Pygtail(event.src_path):
-            # print(f"\t{line}")
-            self.pool.insert_rows(self.query, (line, ), key=self.key)  # remember tuple formatting (see psycopg2 docs)
+    def downsample(self, width, start=None, end=None):
+        """Min / max / mean downsampling of the value column: enough to draw a faithful envelope of the series."""
 
+        return self.buckets(width, aggregates=('min', 'max', 'mean'), start=start, end=end)
 
-class FileWatcher:
+    def window(self, width, size, start=None, end=None):
+        """Rolling statistics over the last `size` time buckets, computed on the server.
 
-    def __init__(self, pool, query, src_path, patterns=None, ignore_directories=False, recursive=True, timeout=1, key=1):
+        The window spans `size * width` seconds of time: empty buckets (gaps in the series) count towards it.
 
-        if patterns is None:
-            patterns = ["*.txt"]
+        Args:
+            width (float):          bucket width, in seconds
+            size (int):             number of buckets in the rolling window (current bucket included)
+            start (float):          (optional) only consider timestamps >= start
+            end (float):            (optional) only consider timestamps < end
 
-        self.src_path = src_path
-        self.recursive = recursive
-        self.event_observer = PollingObserver(timeout=timeout)
-        self.event_handler = InsertToSQL(pool, query, patterns=patterns, ignore_directories=ignore_directories, key=key)
+        Returns:
+            df (pandas.DataFrame):  one row per non-empty bucket with its mean and rolling mean / std / min / max
+        """
 
-    def bark(self):
+        if int(size) < 1:
+            raise ValueError(f"Rolling window size must be a positive number of buckets, got {size}.")
 
-        self.start()
+        inner, args = self._bucket_query(width, ('min', 'max', 'mean'), start, end)
+        query = sql.SQL("SELECT bucket, count, mean, "
+                        "avg(mean) OVER w AS rolling_mean, "
+                        "stddev_samp(mean) OVER w AS rolling_std, "
+                        "min(min) OVER w AS rolling_min, "
+                        "max(max) OVER w AS rolling_max "
+                        "FROM ({}) AS b "
+                        "WINDOW w AS (ORDER BY bucket RANGE BETWEEN %s PRECEDING AND CURRENT ROW) "
+                        "ORDER BY bucket;").format(inner)
+        columns = ['bucket', 'count', 'mean', 'rolling_mean', 'rolling_std', 'rolling_min', 'rolling_max']
 
-        try:
-            while True:
+        # RANGE offset on the float8 bucket start time (PostgreSQL >= 11), so that the window is measured in time
+        return self._fetch(query, args + [float((int(size) - 1) * width)], columns)
+
+    def lttb(self, threshold, start=None, end=None, oversampling=4):
+        """Largest-Triangle-Three-Buckets decimation of the series down to `threshold` points, for plotting.
+
+        The server first reduces the series to the first / last / min / max points of `threshold * oversampling`
+        time buckets (M4 aggregation, which preserves the visual shape of the series), then LTTB runs locally
+        on that already small set of points. The M4 points are picked by a single GROUP BY over the raw rows
+        (min / max of [t, v] and [v, t] arrays): only the reduced set gets sorted.
+
+        Args:
+            threshold (int):        number of points to return
+            start (float):          (optional) only consider timestamps >= start
+            end (float):            (optional) only consider timestamps < end
+            oversampling (int):     number of server-side buckets per returned point
+
+        Returns:
+            df (pandas.DataFrame):  `threshold` (or fewer) points of the series, ordered by time
+        """
+
+        if self.value is None:
+            raise ValueError("LTTB decimation requires a value_column.")
+        if int(threshold) < 3:
+            raise ValueError(f"LTTB decimation needs to keep at least 3 points, got {threshold}.")
 
-                # Main Loop.
-                # Watchdog is polling every TIMEOUT seconds
+        where, args = self._where(start, end, not_null=(self.time, self.value))
+        query = sql.SQL("WITH s AS (SELECT {t}::float8 AS t, {v}::float8 AS v FROM {table}{where}), "
+                        "bounds AS (SELECT min(t) AS t0, max(t) - min(t) AS span FROM s), "
+                        "b AS (SELECT t, v, least(floor((t - t0) / nullif(span, 0) * %s), %s - 1) AS bucket "
+                        "FROM s, bounds), "
+                        "m AS (SELECT min(ARRAY[t, v]) AS p_first, max(ARRAY[t, v]) AS p_last, "
+                        "min(ARRAY[v, t]) AS p_min, max(ARRAY[v, t]) AS p_max FROM b GROUP BY bucket) "
+                        "SELECT p_first[1] AS t, p_first[2] AS v FROM m "
+                        "UNION SELECT p_last[1], p_last[2] FROM m "
+                        "UNION SELECT p_min[2], p_min[1] FROM m "
+                        "UNION SELECT p_max[2], p_max[1] FROM m "
+                        "ORDER BY t;").format(t=self.time, v=self.value, table=self.table, where=where)
 
-                pass
+        n_buckets = int(threshold) * int(oversampling)
+        df = self._fetch(query, args + [n_buckets, n_buckets], ['t', 'v'])
+        keep = lttb_indices(df['t'].to_numpy(), df['v'].to_numpy(), int(threshold))
 
-        except KeyboardInterrupt:
-            self.stop()
+        return df.iloc[keep].reset_index(drop=True)
 
-    def start(self):
-        # Schedule observer
-        self.event_observer.schedule(self.event_handler, self.src_path, recursive=self.recursive)
-        # Start watchdog thread; can give it name with observer.set_name()
-        self.event_observer.start()
 
-    def stop(self):
-        self.event_observer.stop()
-        self.event_observer.join()
+def to_typed_df(records, columns):
+    """Make a pandas DataFrame with float64 columns (int64 for counts) out of SQL query results."""
+
+    import numpy as np
+    import pandas as pd
+
+    records = records if records is not None else []
+    df = pd.DataFrame([tuple(r) for r in records], columns=columns)
+    dtypes = {c: np.int64 if c == 'count' else np.float64 for c in columns}
+
+    return df.astype(dtypes)
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets decimation of the (x, y) series.
+
+    See: S. Steinarsson, "Downsampling Time Series for Visual Representation" (2013).
+    """
+
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+
+    # Bucket edges over the inner points: first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+
+        lo, hi = edges[i], edges[i + 1]
+
+        # Average point of the next bucket (the last point for the last bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+
+        # Pick the point of this bucket forming the largest triangle with the previous kept point and the average
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+
+    return keep
 
 
 class NotifyHandler:
@@ -443,6 +849,8 @@ class Listener:
 
     def run(self):
 
+        import eventlet
+
         queue = eventlet.Queue()  # multi-producer, multi-consumer queue that works across greenlets
         g = eventlet.spawn(self.subscribe, queue)  # spawn async greenthread in parallel
 
@@ -468,6 +876,8 @@ class Listener:
     def subscribe(self, q):
         """Green thread process waiting for NOTIFYs on the channel and feeding them to the queue"""
 
+        from eventlet.hubs import trampoline
+
         # Subscribe to notification channel
         self.pool.listen_on_channel(self.channel, key=self.key)
 
@@ -0,0 +1,87 @@
+"""
+File watching subsystem: kept out of utils.py so that processes which never watch files don't import watchdog.
+"""
+
+from loguru import logger
+from pygtail import Pygtail
+from watchdog.events import PatternMatchingEventHandler
+from watchdog.observers.polling import PollingObserver
+
+
+class InsertToSQL(PatternMatchingEventHandler):
+
+    def __init__(self, pool, query, patterns=None, ignore_patterns=None, ignore_directories=True, case_sensitive=True, key=1):
+
+        super().__init__(patterns, ignore_patterns, ignore_directories, case_sensitive)
+
+        self.pool = pool
+        self.key = key
+        self.query = query
+
+    # The following event_type exist:
+    # 'moved', 'deleted', 'created', 'modified'
+
+    # Here we handle only the default callback for 'modified' event
+    # which will be triggered under the hood only for files matching pattern
+    def on_modified(self, event):
+
+        # And decide to only watch for file changes
+        if not event.is_directory:
+
+            # Process event (i.e send SQL)
+            self.process_event(event)
+
+    def process_event(self, event):
+        """Function handling what happens to an event raised by the watchdog: here we write any file changes as new entries
+        in a database table.
+
+        Args:
+            event:                  watchdog event
+            database (Database):    Database object containing the table we want to inject to
+            query (string):         SQL query psycopg2 template whose %s will be filled by new file contents
+        """
+
+        logger.debug(f"Event detected: {event.event_type} {event.src_path}")
+
+        # Use Pygtail to return unread (i.e.) new lines in modified file
+        for line in Pygtail(event.src_path):
+            # print(f"\t{line}")
+            self.pool.insert_rows(self.query, (line, ), key=self.key)  # remember tuple formatting (see psycopg2 docs)
+
+
+class FileWatcher:
+
+    def __init__(self, pool, query, src_path, patterns=None, ignore_directories=False, recursive=True, timeout=1, key=1):
+
+        if patterns is None:
+            patterns = ["*.txt"]
+
+        self.src_path = src_path
+        self.recursive = recursive
+        self.event_observer = PollingObserver(timeout=timeout)
+        self.event_handler = InsertToSQL(pool, query, patterns=patterns, ignore_directories=ignore_directories, key=key)
+
+    def bark(self):
+
+        self.start()
+
+        try:
+            while True:
+
+                # Main Loop.
+                # Watchdog is polling every TIMEOUT seconds
+
+                pass
+
+        except KeyboardInterrupt:
+            self.stop()
+
+    def start(self):
+        # Schedule observer
+        self.event_observer.schedule(self.event_handler, self.src_path, recursive=self.recursive)
+        # Start watchdog thread; can give it name with observer.set_name()
+        self.event_observer.start()
+
+    def stop(self):
+        self.event_observer.stop()
+        self.event_observer.join()